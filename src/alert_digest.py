@@ -0,0 +1,58 @@
+"""alert_digest.py"""
+
+import os
+import json
+import datetime
+from dateutil import parser as dateparser
+from typing import Any, Dict, List, Optional
+
+
+class AlertDigest():
+    # A window is only flushed by a later run, so it must not exceed the interval between runs
+    # (and stays well under the 60-minute nowcast, whose points are dropped as the alert is held).
+    def __init__(self, window_minutes: Optional[float] = None, state_path: Optional[str] = None) -> None:
+        if window_minutes is None:
+            window_minutes = float(os.getenv("RAIN_ALERT_DIGEST_WINDOW", "0"))
+        self.window: datetime.timedelta = datetime.timedelta(minutes=window_minutes)
+        self.state_path: str = state_path or os.getenv("DIGEST_STATE_PATH", "./digest_state.json")
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(",", ":"))
+
+    def add(self, channel: str, alert: Dict[str, Any], now: datetime.datetime) -> None:
+        # A newer alert for the same point replaces the one still waiting in the window.
+        pending: Dict[str, Any] = self.state.setdefault(channel, {"opened": now.isoformat(), "alerts": {}})
+        pending["alerts"][alert["name"]] = alert
+
+    def discard(self, channel: str, name: str) -> None:
+        # A point that no longer forecasts rain must not be flushed later with its stale alert.
+        pending: Optional[Dict[str, Any]] = self.state.get(channel)
+        if pending is None:
+            return
+
+        pending["alerts"].pop(name, None)
+        if not pending["alerts"]:
+            del self.state[channel]
+
+    def is_pending(self, channel: str) -> bool:
+        return channel in self.state
+
+    def flush(self, now: datetime.datetime) -> Dict[str, List[Dict[str, Any]]]:
+        flushed: Dict[str, List[Dict[str, Any]]] = {}
+        for channel in list(self.state):
+            if now - dateparser.parse(self.state[channel]["opened"]) < self.window:
+                continue
+
+            alerts: List[Dict[str, Any]] = list(self.state.pop(channel)["alerts"].values())
+            flushed[channel] = sorted(alerts, key=lambda alert: alert["onset"])
+
+        return flushed
@@ -0,0 +1,170 @@
+"""alert_rules.py"""
+
+import enum
+import datetime
+import operator
+from dateutil import parser as dateparser
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from constants import *
+
+
+class WeatherAttr(enum.IntFlag):
+    NONE = 0
+    SUNNY = enum.auto()
+    CLOUDY = enum.auto()
+    RAIN = enum.auto()
+    SNOW = enum.auto()
+    THUNDER = enum.auto()
+    FOG = enum.auto()
+    WIND = enum.auto()
+
+
+_emoji_attr_map: Dict[str, WeatherAttr] = {
+    "☀": WeatherAttr.SUNNY,
+    "☁": WeatherAttr.CLOUDY,
+    "🌧": WeatherAttr.RAIN,
+    "❄": WeatherAttr.SNOW,
+    "☃": WeatherAttr.SNOW,
+    "⛈": WeatherAttr.RAIN | WeatherAttr.THUNDER,
+    "⚡": WeatherAttr.THUNDER,
+    "🌫": WeatherAttr.FOG,
+    "💨": WeatherAttr.WIND,
+    "🌪": WeatherAttr.WIND,
+}
+
+
+def _classify_emoji(emoji: str) -> WeatherAttr:
+    attr: WeatherAttr = WeatherAttr.NONE
+    for char, char_attr in _emoji_attr_map.items():
+        if char in emoji:
+            attr |= char_attr
+
+    return attr
+
+
+wc_attr_map: Dict[str, WeatherAttr] = {
+    code: _classify_emoji(emoji) for code, emoji in wc_emoji_map.items()
+}
+
+
+_compare_ops: Dict[str, Callable[[float, float], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    "≤": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "≥": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_numeric_fields: Tuple[str, ...] = ("pop", "temp_min", "temp_max")
+_attr_fields: Tuple[str, ...] = ("weather",)
+
+
+class AlertMatch(NamedTuple):
+    rule: str
+    area_index: int
+    area_name: str
+    slot_index: int
+    time: datetime.datetime
+    value: Any
+
+
+class ForecastColumns():
+    def __init__(self, forecast: Dict[str, Any]) -> None:
+        self.rows: Dict[str, List[Tuple[int, str, int, datetime.datetime, Any]]] = {
+            field: [] for field in _numeric_fields + _attr_fields
+        }
+
+        _time_series_weather: Dict[str, Any] = forecast["timeSeries"][0]
+        _time_series_pop: Dict[str, Any] = forecast["timeSeries"][1]
+        _time_series_temp: Dict[str, Any] = forecast["timeSeries"][2]
+
+        _weather_time_defines: List[datetime.datetime] = [dateparser.parse(dst) for dst in _time_series_weather["timeDefines"]]
+        for area_index, area in enumerate(_time_series_weather["areas"]):
+            for slot_index, (code, time) in enumerate(zip(area["weatherCodes"], _weather_time_defines)):
+                self.rows["weather"].append(
+                    (area_index, area["area"]["name"], slot_index, time, wc_attr_map.get(code, WeatherAttr.NONE)))
+
+        _pop_time_defines: List[datetime.datetime] = [dateparser.parse(dst) for dst in _time_series_pop["timeDefines"]]
+        for area_index, area in enumerate(_time_series_pop["areas"]):
+            for slot_index, (pop, time) in enumerate(zip(area["pops"], _pop_time_defines)):
+                value: Optional[float] = self._to_float(pop)
+                if value is not None:
+                    self.rows["pop"].append((area_index, area["area"]["name"], slot_index, time, value))
+
+        # JMA publishes the morning lowest at 00:00 and the daytime highest at 09:00, except that
+        # the 05:00/11:00 reports repeat today's highest at today's 00:00 (hence "最低: -℃" for today).
+        _report_date: datetime.date = dateparser.parse(forecast["reportDatetime"]).date()
+        _temp_time_defines: List[datetime.datetime] = [dateparser.parse(dst) for dst in _time_series_temp["timeDefines"]]
+        for area_index, area in enumerate(_time_series_temp["areas"]):
+            for slot_index, (temp, time) in enumerate(zip(area["temps"], _temp_time_defines)):
+                if time.hour == 0 and time.date() == _report_date:
+                    continue
+
+                value = self._to_float(temp)
+                if value is not None:
+                    field: str = "temp_min" if time.hour == 0 else "temp_max"
+                    self.rows[field].append((area_index, area["area"]["name"], slot_index, time, value))
+
+    def _to_float(self, value: str) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class AlertRule():
+    def __init__(self, name: str, expression: str) -> None:
+        self.name = name
+        self.expression = expression
+        self.field, self._test = self._compile(expression)
+
+    def _compile(self, expression: str) -> Tuple[str, Callable[[Any], bool]]:
+        tokens: List[str] = expression.split()
+        if len(tokens) != 3:
+            raise ValueError(f"Cannot parse alert rule: {expression}")
+
+        field, op, operand = tokens
+
+        if field in _attr_fields:
+            try:
+                attr: WeatherAttr = WeatherAttr[operand.upper()]
+            except KeyError:
+                raise ValueError(f"Unknown weather attribute: {operand}")
+
+            if op == "has":
+                return field, lambda value: bool(value & attr)
+            elif op == "not":
+                return field, lambda value: not (value & attr)
+            raise ValueError(f"Unknown operator for {field}: {op}")
+
+        if field in _numeric_fields:
+            if op not in _compare_ops:
+                raise ValueError(f"Unknown operator for {field}: {op}")
+            compare: Callable[[float, float], bool] = _compare_ops[op]
+            threshold: float = float(operand)
+            return field, lambda value: compare(value, threshold)
+
+        raise ValueError(f"Unknown forecast field: {field}")
+
+    def evaluate(self, columns: ForecastColumns) -> List[AlertMatch]:
+        test: Callable[[Any], bool] = self._test
+        return [
+            AlertMatch(self.name, area_index, area_name, slot_index, time, value)
+            for area_index, area_name, slot_index, time, value in columns.rows[self.field]
+            if test(value)
+        ]
+
+
+class AlertRuleEngine():
+    def __init__(self, rules: Dict[str, str] = alert_rules) -> None:
+        self.rules: List[AlertRule] = [AlertRule(name, expression) for name, expression in rules.items()]
+
+    def evaluate(self, forecast: Dict[str, Any]) -> Dict[str, List[AlertMatch]]:
+        return self.evaluate_columns(ForecastColumns(forecast))
+
+    def evaluate_columns(self, columns: ForecastColumns) -> Dict[str, List[AlertMatch]]:
+        return {rule.name: rule.evaluate(columns) for rule in self.rules}
@@ -1,12 +1,23 @@
 """wc_emoji_map.py"""
 
-from typing import Dict, Final, List
+from typing import Any, Dict, Final, List
 
 
 TARGET_LATITUDE: Final = 35.1356448
 TARGET_LONGITUDE: Final = 136.9760683
 
 
+# Points watched by rain_alert.py; alerts are merged into one message per channel.
+watch_points: List[Dict[str, Any]] = [
+    {
+        "name": "名古屋",
+        "latitude": TARGET_LATITUDE,
+        "longitude": TARGET_LONGITUDE,
+        "channel": "C02LZ68NS9H",
+    },
+]
+
+
 dow_map: List[str] = [
     "月",
     "火",
@@ -139,6 +150,72 @@ wc_emoji_map: Dict[str, str] = {
     "450": "❄⚡",
 }
 
+warning_offices: List[str] = [
+    "230000",
+]
+
+
+warning_code_map: Dict[str, str] = {
+    "02": "暴風雪警報",
+    "03": "大雨警報",
+    "04": "洪水警報",
+    "05": "暴風警報",
+    "06": "大雪警報",
+    "07": "波浪警報",
+    "08": "高潮警報",
+    "10": "大雨注意報",
+    "12": "大雪注意報",
+    "13": "風雪注意報",
+    "14": "雷注意報",
+    "15": "強風注意報",
+    "16": "波浪注意報",
+    "17": "融雪注意報",
+    "18": "洪水注意報",
+    "19": "高潮注意報",
+    "20": "濃霧注意報",
+    "21": "乾燥注意報",
+    "22": "なだれ注意報",
+    "23": "低温注意報",
+    "24": "霜注意報",
+    "25": "着氷注意報",
+    "26": "着雪注意報",
+    "32": "暴風雪特別警報",
+    "33": "大雨特別警報",
+    "35": "暴風特別警報",
+    "36": "大雪特別警報",
+    "37": "波浪特別警報",
+    "38": "高潮特別警報",
+}
+
+
+# Listed under "注意" in the forecast message when they match the forecast day of Nagoya.
+# label: "<field> <op> <operand>"
+#   field: pop, temp_min, temp_max (op: <, <=, >, >=, ==, !=) or weather (op: has, not)
+#   weather attributes: sunny, cloudy, rain, snow, thunder, fog, wind
+alert_rules: Dict[str, str] = {
+    "雪": "weather has snow",
+    "雷": "weather has thunder",
+    "降水確率60%以上": "pop >= 60",
+    "最低気温3℃未満": "temp_min < 3",
+    "最高気温35℃以上": "temp_max >= 35",
+}
+
+# Upper bounds checked by profiling.profile_run (wall_time: seconds, peak_memory: bytes traced by tracemalloc)
+profile_budgets: Dict[str, Dict[str, float]] = {
+    "weather_forecast": {
+        "wall_time": 15.0,
+        "peak_memory": 32 * 1024 * 1024,
+    },
+    "rain_alert": {
+        "wall_time": 20.0,
+        "peak_memory": 64 * 1024 * 1024,
+    },
+    "jma_warning": {
+        "wall_time": 30.0,
+        "peak_memory": 32 * 1024 * 1024,
+    },
+}
+
 random_emoji_map: List[str] = [
     ':alien:',
     ':ocean:',
@@ -0,0 +1,214 @@
+"""jma_warning.py"""
+
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib import request, error
+from pprint import pprint
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from constants import *
+from profiling import profile_run
+
+
+# Downgrade statuses (警報から注意報 etc.) sit on the lower-level code now in force, so they count as active.
+_inactive_statuses: Tuple[str, ...] = ("解除", "発表警報・注意報はなし")
+
+# Block Kit allows 50 blocks per message; leave room for the header and footer.
+MAX_AREAS_PER_MESSAGE: int = 40
+
+
+class WarningChange(NamedTuple):
+    office: str
+    area_code: str
+    issued: List[str]
+    lifted: List[str]
+    active: List[str]
+
+
+class WarningWatcher():
+    def __init__(
+        self,
+        offices: List[str] = warning_offices,
+        area_type_index: int = 0, # 0: class10 (一次細分区域), 1: class20 (市町村)
+        state_path: Optional[str] = None,
+    ) -> None:
+        self.offices = offices
+        self.area_type_index = area_type_index
+        self.state_path: str = state_path or os.getenv("WARNING_STATE_PATH", "./warning_state.json")
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+
+        self.warning_url: str = "https://www.jma.go.jp/bosai/warning/data/warning/{office}.json"
+        self.area_url: str = "https://www.jma.go.jp/bosai/common/const/area.json"
+        self._area_names: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _fetch(self, office: str, last_modified: Optional[str]) -> Optional[Tuple[str, bytes]]:
+        headers: Dict[str, str] = {}
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        req: request.Request = request.Request(self.warning_url.format(office=office), headers=headers)
+        try:
+            with request.urlopen(req) as res:
+                return res.headers.get("Last-Modified", ""), res.read()
+        except error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+
+    def _get_signature(self, warnings: List[Dict[str, Any]]) -> str:
+        payload: str = json.dumps(warnings, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _get_active_codes(self, warnings: List[Dict[str, Any]]) -> Set[str]:
+        return {
+            warning["code"] for warning in warnings
+            if "code" in warning and warning.get("status") not in _inactive_statuses
+        }
+
+    def get_area_name(self, area_code: str) -> str:
+        # area.json is large, so it is only fetched once something has actually changed.
+        if self._area_names is None:
+            req: request.Request = request.Request(self.area_url)
+            with request.urlopen(req) as res:
+                areas: Dict[str, Dict[str, Any]] = json.loads(res.read())
+            self._area_names = {
+                code: area["name"]
+                for area_class in ("offices", "class10s", "class20s")
+                for code, area in areas.get(area_class, {}).items()
+            }
+
+        return self._area_names.get(area_code, area_code)
+
+    def poll(self, office: str) -> List[WarningChange]:
+        # Without a previous snapshot (first deploy or evicted cache) everything would look newly issued,
+        # so the first successful poll of an office only seeds the snapshot.
+        previous_snapshot: Optional[Dict[str, Any]] = self.state.get(office)
+        is_seeding: bool = previous_snapshot is None or not previous_snapshot["report_datetime"]
+
+        fetched: Optional[Tuple[str, bytes]] = self._fetch(
+            office, previous_snapshot["last_modified"] if previous_snapshot is not None else None)
+        if fetched is None:
+            return []
+
+        # Only created after a successful fetch, so a failed first poll leaves the office unseeded.
+        snapshot: Dict[str, Any] = self.state.setdefault(office, {"last_modified": "", "report_datetime": "", "areas": {}})
+        last_modified, body = fetched
+        snapshot["last_modified"] = last_modified
+
+        warning_data: Dict[str, Any] = json.loads(body)
+        if warning_data["reportDatetime"] == snapshot["report_datetime"]:
+            return []
+        snapshot["report_datetime"] = warning_data["reportDatetime"]
+
+        changes: List[WarningChange] = []
+        area_snapshots: Dict[str, Dict[str, Any]] = snapshot["areas"]
+        for area in warning_data["areaTypes"][self.area_type_index]["areas"]:
+            warnings: List[Dict[str, Any]] = area.get("warnings", [])
+            signature: str = self._get_signature(warnings)
+
+            area_snapshot: Optional[Dict[str, Any]] = area_snapshots.get(area["code"])
+            if area_snapshot is not None and area_snapshot["sig"] == signature:
+                continue
+
+            previous: Set[str] = set(area_snapshot["codes"]) if area_snapshot is not None else set()
+            active: Set[str] = self._get_active_codes(warnings)
+            area_snapshots[area["code"]] = {"sig": signature, "codes": sorted(active)}
+
+            if active != previous and not is_seeding:
+                changes.append(WarningChange(
+                    office, area["code"], sorted(active - previous), sorted(previous - active), sorted(active)))
+
+        return changes
+
+    def poll_all(self) -> List[WarningChange]:
+        changes: List[WarningChange] = []
+        for office in self.offices:
+            try:
+                changes.extend(self.poll(office))
+            except error.URLError as e:
+                print(f"Cannot poll warnings for {office}: {e.reason}")
+
+        return changes
+
+    def _format_codes(self, codes: List[str]) -> str:
+        return "、".join(warning_code_map.get(code, code) for code in codes)
+
+    def generate_blocks(self, changes: List[WarningChange]) -> Tuple[str, List[dict]]:
+        text: str = "⚠気象警報・注意報⚠"
+        blocks: List[dict] = [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": text,
+                    "emoji": True
+                }
+            },
+        ]
+
+        for change in changes:
+            lines: List[str] = [f"*{self.get_area_name(change.office)} {self.get_area_name(change.area_code)}*"]
+            if change.issued:
+                lines.append(f"発表: {self._format_codes(change.issued)}")
+            if change.lifted:
+                lines.append(f"解除: {self._format_codes(change.lifted)}")
+            if change.active:
+                lines.append(f"発表中: {self._format_codes(change.active)}")
+            else:
+                lines.append("発表中の警報・注意報はありません")
+
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "\n".join(lines)
+                }
+            })
+
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "<https://www.jma.go.jp/bosai/warning/|気象警報・注意報を見る>"
+            }
+        })
+
+        return text, blocks
+
+
+def main() -> None:
+    watcher = WarningWatcher()
+    changes: List[WarningChange] = watcher.poll_all()
+    pprint(changes)
+
+    client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+    for i in range(0, len(changes), MAX_AREAS_PER_MESSAGE):
+        text, blocks = watcher.generate_blocks(changes[i:i + MAX_AREAS_PER_MESSAGE])
+        try:
+            response = client.chat_postMessage(channel="C02LZ68NS9H", text=text, blocks=blocks)
+            pprint(response.status_code)
+        except SlackApiError as e:
+            print("Error posting warnings: {}".format(e))
+            return
+
+    watcher.save()
+
+
+if __name__ == "__main__":
+    with profile_run("jma_warning"):
+        main()
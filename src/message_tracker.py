@@ -0,0 +1,103 @@
+"""message_tracker.py"""
+
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+
+class MessageTracker():
+    def __init__(self, state_path: Optional[str] = None, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self.state_path: str = state_path or os.getenv("MESSAGE_STATE_PATH", "./message_state.json")
+        self.state: Dict[str, Dict[str, str]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        for stale_key in list(self.state)[:-self.max_entries]:
+            del self.state[stale_key]
+
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _get_key(self, channel: str, key: str) -> str:
+        return f"{channel}:{key}"
+
+    def _get_digest(self, *contents: Any) -> str:
+        payload: str = json.dumps(contents, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get_ts(self, channel: str, key: str) -> Optional[str]:
+        entry: Optional[Dict[str, str]] = self.state.get(self._get_key(channel, key))
+        if entry is None:
+            return None
+
+        return entry["ts"]
+
+    def send(
+        self,
+        client: WebClient,
+        channel: str,
+        key: str,
+        text: str,
+        blocks: List[dict],
+        **kwargs: Any,
+    ) -> Optional[str]:
+        # Returns "posted", "reposted", "updated", or None when nothing changed and nothing was sent.
+        # kwargs (e.g. icon_emoji) only apply to chat.postMessage; chat.update cannot change them,
+        # so a change there deletes the old message and posts a new one.
+        state_key: str = self._get_key(channel, key)
+        digest: str = self._get_digest(text, blocks)
+        options_digest: str = self._get_digest(kwargs)
+        entry: Optional[Dict[str, str]] = self.state.get(state_key)
+
+        if entry is not None and entry["digest"] == digest and entry.get("options_digest") == options_digest:
+            return None
+
+        action: str
+        if entry is None:
+            response = client.chat_postMessage(channel=channel, text=text, blocks=blocks, **kwargs)
+            action = "posted"
+        elif entry.get("options_digest") != options_digest:
+            try:
+                client.chat_delete(channel=entry["channel"], ts=entry["ts"])
+            except SlackApiError as e:
+                if e.response.get("error") != "message_not_found":
+                    raise
+            response = client.chat_postMessage(channel=channel, text=text, blocks=blocks, **kwargs)
+            action = "reposted"
+        else:
+            try:
+                # chat.update needs the channel ID that chat.postMessage returned.
+                response = client.chat_update(channel=entry["channel"], ts=entry["ts"], text=text, blocks=blocks)
+                action = "updated"
+            except SlackApiError as e:
+                if e.response.get("error") != "message_not_found":
+                    raise
+                response = client.chat_postMessage(channel=channel, text=text, blocks=blocks, **kwargs)
+                action = "posted"
+
+        self.state.pop(state_key, None)
+        self.state[state_key] = {
+            "ts": response["ts"],
+            "channel": response["channel"],
+            "digest": digest,
+            "options_digest": options_digest,
+        }
+        self._save()
+
+        return action
+
+    def close(self, channel: str, key: str) -> None:
+        if self.state.pop(self._get_key(channel, key), None) is not None:
+            self._save()
+
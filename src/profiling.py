@@ -0,0 +1,106 @@
+"""profiling.py"""
+
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from constants import *
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+def is_profiling_enabled() -> bool:
+    return "--profile" in sys.argv or os.getenv("WEATHER_BOT_PROFILE", "") not in ("", "0", "false")
+
+
+def check_budget(
+    name: str,
+    wall_time: float,
+    peak_memory: int,
+    budgets: Dict[str, Dict[str, float]] = profile_budgets,
+) -> List[str]:
+    budget: Dict[str, float] = budgets.get(name, {})
+    violations: List[str] = []
+
+    if "wall_time" in budget and wall_time > budget["wall_time"]:
+        violations.append(f"{name}: wall time {wall_time:.3f}s exceeds budget {budget['wall_time']:.3f}s")
+
+    if "peak_memory" in budget and peak_memory > budget["peak_memory"]:
+        violations.append(f"{name}: peak allocation {peak_memory}B exceeds budget {int(budget['peak_memory'])}B")
+
+    return violations
+
+
+def _write_artifacts(
+    name: str,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    summary: Dict[str, Any],
+) -> None:
+    out_dir: str = os.getenv("WEATHER_BOT_PROFILE_DIR", "./profile")
+    os.makedirs(out_dir, exist_ok=True)
+
+    profiler.dump_stats(os.path.join(out_dir, f"{name}.prof"))
+
+    stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=stats_stream).sort_stats("cumulative").print_stats(40)
+    with open(os.path.join(out_dir, f"{name}-stats.txt"), "w") as f:
+        f.write(stats_stream.getvalue())
+
+    with open(os.path.join(out_dir, f"{name}-alloc.txt"), "w") as f:
+        for stat in snapshot.statistics("lineno")[:25]:
+            f.write(f"{stat}\n")
+
+    with open(os.path.join(out_dir, f"{name}-summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+@contextmanager
+def profile_run(name: str, enabled: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+    # The yielded dict is filled with wall_time, peak_memory and violations once the block exits.
+    result: Dict[str, Any] = {}
+    if enabled is None:
+        enabled = is_profiling_enabled()
+
+    if not enabled:
+        yield result
+        return
+
+    tracemalloc.start(25)
+    profiler = cProfile.Profile()
+    start: float = time.perf_counter()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        wall_time: float = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        violations: List[str] = check_budget(name, wall_time, peak_memory)
+        result.update({
+            "name": name,
+            "wall_time": wall_time,
+            "peak_memory": peak_memory,
+            "budget": profile_budgets.get(name, {}),
+            "violations": violations,
+        })
+        _write_artifacts(name, profiler, snapshot, result)
+
+        print(f"[profile] {name}: wall time {wall_time:.3f}s, peak allocation {peak_memory}B")
+        for violation in violations:
+            print(f"[profile] {violation}")
+
+    if violations and os.getenv("WEATHER_BOT_PROFILE_STRICT"):
+        raise BudgetExceededError("; ".join(violations))
@@ -1,27 +1,30 @@
 """rain_alert.py"""
 
 import os
-import json
 import math
+import bisect
 import datetime
+import unicodedata
 from dateutil import parser
-from typing import Any, Dict, Final, List, Optional
-from urllib import request, parse, error
+from typing import Any, Dict, Final, List, Optional, Set, Tuple
 from pprint import pprint
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from constants import *
+from alert_digest import AlertDigest
+from message_tracker import MessageTracker
+from profiling import profile_run
+from yahoo_weather import get_weather_lists
 
 
-YAHOO_APPID: Final = os.getenv("YAHOO_APPID")
 BOT_TOKEN: Final = os.getenv("SLACK_BOT_TOKEN")
-WORKSPACE_URL: Final = os.getenv("SLACK_WORKSPACE_URL")
-if WORKSPACE_URL is None:
-    raise KeyError
+CHART_MODE: Final = os.getenv("RAIN_ALERT_CHART", "image") # image: matplotlib upload, sparkline: inline text
+
+
+_strength_thresholds: List[float] = [3.0, 5.0, 10.0, 20.0, 30.0, 50.0, 80.0]
+_sparkline_chars: str = "▁▂▃▄▅▆▇█"
 
 
 def _get_strength(rainfall: float) -> str:
@@ -46,7 +49,38 @@ def _get_strength(rainfall: float) -> str:
     return strength
 
 
+def _get_strength_level(rainfall: float) -> int:
+    # Index of the _get_strength class, 0 (小) to 7 (猛烈な).
+    return bisect.bisect_right(_strength_thresholds, rainfall)
+
+
+def _render_sparkline(plot_x: List[int], plot_y: List[float]) -> Dict[str, Any]:
+    bars: str = "".join(
+        (_sparkline_chars[_get_strength_level(rain_fall)] if rain_fall > 0.0 else "·") * 2 for rain_fall in plot_y)
+    axis: str = f"{plot_x[0]}".ljust(len(bars) // 2) + f"{plot_x[-1]}分".rjust(len(bars) - len(bars) // 2)
+
+    markers: List[str] = []
+    prev_strength: Optional[str] = None
+    for minutes, rain_fall in zip(plot_x, plot_y):
+        strength: Optional[str] = _get_strength(rain_fall) if rain_fall > 0.0 else None
+        if strength != prev_strength:
+            markers.append(f"{minutes}分 {strength or '止む'}")
+            prev_strength = strength
+
+    marker_text: str = " → ".join(markers)
+    return {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"*60分後までの降水量*\n```{bars}\n{axis}```\n{marker_text}"
+        }
+    }
+
+
 def _render_img(plot_x: List[int], plot_y: List[float]):
+    # Imported here so the sparkline mode never pays for loading matplotlib.
+    import matplotlib.pyplot as plt
+
     plt.rcParams['figure.subplot.bottom'] = 0.17
     fig, ax = plt.subplots(figsize=(5, 3))
     ax.bar(plot_x, plot_y, width=3, color='lightblue', zorder=2, align='center')
@@ -63,33 +97,18 @@ def _render_img(plot_x: List[int], plot_y: List[float]):
     ax.spines['top'].set_visible(False)
     ax.spines['bottom'].set_color('dimgray')
     plt.savefig('plot.png')
+    plt.close(fig)
 
 
 
-def main() -> None:
-    url = 'https://map.yahooapis.jp/weather/V1/place'
-    params = {
-        'appid': YAHOO_APPID,
-        'coordinates': f"{TARGET_LONGITUDE},{TARGET_LATITUDE}",
-        'output': "json",
-        'interval': 5,
-    }
-
-    req = request.Request(f'{url}?{parse.urlencode(params)}')
-    with request.urlopen(req) as res:
-        body = res.read()
-
-    response = json.loads(body)
-
-    weather_list = response["Feature"][0]["Property"]["WeatherList"]["Weather"]
-
+def _analyze(name: str, weather_list: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     current_time: datetime.datetime
     bgn_rain_fall: float = 0.0
     bgn_rain_time: datetime.datetime
     stg_rain_fall: float = 0.0
     stg_rain_time: datetime.datetime
     end_rain_fall: float = 999.9
-    end_rain_time: datetime.datetime
+    end_rain_time: Optional[datetime.datetime] = None
 
     plot_x: List[int] = []
     plot_y: List[float] = []
@@ -115,67 +134,114 @@ def main() -> None:
                 end_rain_fall = rain_fall
                 end_rain_time = time
 
-    if bgn_rain_fall > 0.0:
-        _render_img(plot_x, plot_y)
+    if bgn_rain_fall <= 0.0:
+        return None
+
+    return {
+        "name": name,
+        "current": current_time.isoformat(),
+        "onset": bgn_rain_time.isoformat(),
+        "onset_rain_fall": bgn_rain_fall,
+        "peak": stg_rain_time.isoformat(),
+        "peak_rain_fall": stg_rain_fall,
+        "end": end_rain_time.isoformat() if end_rain_time is not None else None,
+        "plot_x": plot_x,
+        "plot_y": plot_y,
+    }
 
-        pre_send_data = {
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "<!here>"
-                    }
-                }
-            ]
-        }
 
-        pre_req_header = {
-            'Content-Type': 'application/json',
-        }
-        pre_req_data = json.dumps(pre_send_data)
-        pre_req = request.Request(
-            WORKSPACE_URL, data=pre_req_data.encode(), method='POST', headers=pre_req_header)
-        try:
-            with request.urlopen(pre_req) as response:
-                pass
-        except error.URLError as e:
-            print(e.reason)
+def _rebase(alert: Dict[str, Any], flush_time: datetime.datetime) -> None:
+    # Drops the 5-minute points that passed while the alert was held so the chart starts at the flush.
+    current_time: datetime.datetime = parser.parse(alert["current"])
+    if flush_time <= current_time:
+        return
 
-        bgn_strength: str = _get_strength(bgn_rain_fall)
-        bgn_delta: datetime.timedelta = bgn_rain_time - current_time
-        bgn_delta_min: int = math.floor(bgn_delta.total_seconds() / 60)
+    passed: int = math.floor((flush_time - current_time).total_seconds() / 60 / 5)
+    passed = min(passed, len(alert["plot_y"]) - 1)
+    alert["current"] = flush_time.isoformat()
+    alert["plot_x"] = [minutes - passed * 5 for minutes in alert["plot_x"][passed:]]
+    alert["plot_y"] = alert["plot_y"][passed:]
 
-        stg_strength: str = _get_strength(stg_rain_fall)
-        stg_delta: datetime.timedelta = stg_rain_time - current_time
-        stg_delta_min: int = math.floor(stg_delta.total_seconds() / 60)
 
-        end_delta: datetime.timedelta = end_rain_time - current_time
-        end_delta_min: int = math.floor(end_delta.total_seconds() / 60)
+def _get_delta_min(alert: Dict[str, Any], key: str) -> int:
+    delta: datetime.timedelta = parser.parse(alert[key]) - parser.parse(alert["current"])
+    return math.floor(delta.total_seconds() / 60)
 
-        body_message: str
-        if 0.0 < bgn_delta_min <= 5.0:
-            body_message = f"まもなく{bgn_strength}雨が降り始めます。"
-        else:
-            body_message = f"{bgn_delta_min}分後に{bgn_strength}雨が降り始めます。"
 
-        if (bgn_delta_min > 0.0) and (bgn_delta_min < stg_delta_min):
-            body_message += f"\n\n{stg_delta_min}分後には{stg_strength}雨になります。"
+def _generate_body_message(alert: Dict[str, Any]) -> str:
+    bgn_strength: str = _get_strength(alert["onset_rain_fall"])
+    bgn_delta_min: int = _get_delta_min(alert, "onset")
+
+    stg_strength: str = _get_strength(alert["peak_rain_fall"])
+    stg_delta_min: int = _get_delta_min(alert, "peak")
 
-        if end_rain_fall < 999.9:
+    body_message: str
+    if bgn_delta_min <= 0.0:
+        body_message = f"{bgn_strength}雨が降り始めています。"
+    elif bgn_delta_min <= 5.0:
+        body_message = f"まもなく{bgn_strength}雨が降り始めます。"
+    else:
+        body_message = f"{bgn_delta_min}分後に{bgn_strength}雨が降り始めます。"
+
+    if (bgn_delta_min > 0.0) and (bgn_delta_min < stg_delta_min):
+        body_message += f"\n\n{stg_delta_min}分後には{stg_strength}雨になります。"
+
+    if alert["end"] is not None:
+        end_delta_min: int = _get_delta_min(alert, "end")
+        if end_delta_min > 0.0:
             body_message += f"\n\n{end_delta_min}分後に弱くなります。"
 
-        send_message_head: str = f"🌧雨雲が接近しています🌧\n"
-        head_block: Dict[str, Any] = {
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": send_message_head,
-                "emoji": True
-            }
+    return body_message
+
+
+def _pad(text: str, width: int) -> str:
+    # Full-width characters take two columns in Slack's monospace code blocks.
+    text_width: int = sum(2 if unicodedata.east_asian_width(char) in ("W", "F") else 1 for char in text)
+    return text + " " * max(0, width - text_width)
+
+
+def _render_summary_table(alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    widths: List[int] = [7, 14, 7, 14, 8]
+    header: List[str] = ["開始", "強さ", "最大", "強さ", "弱まる", "地点"]
+    rows: List[List[str]] = [header]
+    for alert in alerts:
+        end: str = parser.parse(alert["end"]).strftime("%H:%M") if alert["end"] is not None else "-"
+        rows.append([
+            parser.parse(alert["onset"]).strftime("%H:%M"),
+            _get_strength(alert["onset_rain_fall"]),
+            parser.parse(alert["peak"]).strftime("%H:%M"),
+            _get_strength(alert["peak_rain_fall"]),
+            end,
+            alert["name"],
+        ])
+
+    rows_text: str = "\n".join(
+        "".join(_pad(cell, width) for cell, width in zip(row, widths)) + row[-1] for row in rows)
+    return {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"*{len(alerts)}地点で雨が降り始めます*\n```{rows_text}```"
         }
+    }
+
 
-        body_block: Dict[str, Any] = {
+def _generate_blocks(alerts: List[Dict[str, Any]]) -> Tuple[str, List[dict]]:
+    send_message_head: str = f"🌧雨雲が接近しています🌧\n"
+    head_block: Dict[str, Any] = {
+        "type": "header",
+        "text": {
+            "type": "plain_text",
+            "text": send_message_head,
+            "emoji": True
+        }
+    }
+
+    body_message: str
+    body_block: Dict[str, Any]
+    if len(alerts) == 1:
+        body_message = _generate_body_message(alerts[0])
+        body_block = {
             "type": "section",
             "fields": [
                 {
@@ -184,39 +250,67 @@ def main() -> None:
                 },
             ]
         }
+    else:
+        body_message = "、".join(alert["name"] for alert in alerts)
+        body_block = _render_summary_table(alerts)
+
+    foot_block: Dict[str, Any] = {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "<https://weather.yahoo.co.jp/weather/zoomradar/|雨雲レーダーを見る>"
+        }
+    }
 
-        foot_block: Dict[str, Any] = {
+    blocks: List[dict] = []
+    if CHART_MODE == "sparkline":
+        # A single post: the mention rides along and the chart is inline text.
+        blocks.append({
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": "<https://weather.yahoo.co.jp/weather/zoomradar/|雨雲レーダーを見る>"
+                "text": "<!here>"
             }
-        }
+        })
+    blocks.append(head_block)
+    blocks.append(body_block)
+    if CHART_MODE == "sparkline" and len(alerts) == 1:
+        blocks.append(_render_sparkline(alerts[0]["plot_x"], alerts[0]["plot_y"]))
+    blocks.append(foot_block)
 
-        blocks: List[dict] = []
-        blocks.append(head_block)
-        blocks.append(body_block)
-        blocks.append(foot_block)
+    return f"{send_message_head}{body_message}", blocks
 
-        send_data: Dict[str, Any] = {
-            "blocks": blocks
-        }
 
-        req_header = {
-            'Content-Type': 'application/json',
-        }
-        req_data = json.dumps(send_data)
-        req = request.Request(
-            WORKSPACE_URL, data=req_data.encode(), method='POST', headers=req_header)
+def _send_alerts(client: WebClient, tracker: MessageTracker, channel_id: str, alerts: List[Dict[str, Any]]) -> None:
+    event_key = "rain"
+    text, blocks = _generate_blocks(alerts)
+
+    is_new_event: bool = tracker.get_ts(channel_id, event_key) is None
+    if is_new_event and CHART_MODE != "sparkline":
         try:
-            with request.urlopen(req) as response:
-                pass
-        except error.URLError as e:
-            print(e.reason)
+            client.chat_postMessage(channel=channel_id, text="<!here>")
+        except SlackApiError as e:
+            print("Error posting mention: {}".format(e))
+
+    try:
+        action: Optional[str] = tracker.send(
+            client,
+            channel=channel_id,
+            key=event_key,
+            text=text,
+            blocks=blocks,
+        )
+    except SlackApiError as e:
+        print("Error sending alert: {}".format(e))
+        return
+
+    pprint(action)
+
+    # The chart goes out once per rain event; later runs only edit the alert text in place.
+    if is_new_event and CHART_MODE != "sparkline" and len(alerts) == 1:
+        _render_img(alerts[0]["plot_x"], alerts[0]["plot_y"])
 
-        client = WebClient(token=BOT_TOKEN)
         file_name = "./plot.png"
-        channel_id = "C02LZ68NS9H"
         try:
             result = client.files_upload(
                 channels=channel_id,
@@ -227,8 +321,39 @@ def main() -> None:
         except SlackApiError as e:
             print("Error uploading file: {}".format(e))
 
-        
+
+def main() -> None:
+    weather_lists: List[List[Dict[str, Any]]] = get_weather_lists(watch_points)
+
+    now: datetime.datetime = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+    digest = AlertDigest()
+    alerting_channels: Set[str] = set()
+    for point, weather_list in zip(watch_points, weather_lists):
+        alert: Optional[Dict[str, Any]] = _analyze(point["name"], weather_list)
+        if alert is not None:
+            digest.add(point["channel"], alert, now)
+            alerting_channels.add(point["channel"])
+        else:
+            digest.discard(point["channel"], point["name"])
+
+    client = WebClient(token=BOT_TOKEN)
+    tracker = MessageTracker()
+
+    for channel_id in {point["channel"] for point in watch_points}:
+        if channel_id not in alerting_channels and not digest.is_pending(channel_id):
+            tracker.close(channel_id, "rain")
+
+    for channel_id, alerts in digest.flush(now).items():
+        if digest.window > datetime.timedelta(0):
+            # Alerts were held for the window, so relative times and charts start from the flush instead.
+            flush_time: datetime.datetime = now.replace(tzinfo=None)
+            for alert in alerts:
+                _rebase(alert, flush_time)
+        _send_alerts(client, tracker, channel_id, alerts)
+
+    digest.save()
 
 
 if __name__ == "__main__":
-    main()
+    with profile_run("rain_alert"):
+        main()
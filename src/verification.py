@@ -0,0 +1,267 @@
+"""verification.py"""
+
+import os
+import sys
+import json
+import math
+import datetime
+from dateutil import parser as dateparser
+from typing import Any, Dict, List, Optional, Tuple
+from pprint import pprint
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from constants import *
+from yahoo_weather import get_weather_lists
+
+
+POP_THRESHOLD: float = 50.0
+ONSET_BIN_MINUTES: int = 5
+ONSET_MAX_MINUTES: int = 60
+
+JST: datetime.timezone = datetime.timezone(datetime.timedelta(hours=9))
+
+source_name_map: Dict[str, str] = {
+    "jma": "気象庁 降水確率",
+    "yahoo": "Yahoo! 降水短時間予報",
+}
+
+
+def _to_jst(time: datetime.datetime) -> datetime.datetime:
+    # Yahoo! returns naive JST timestamps while JMA ones carry +09:00.
+    if time.tzinfo is None:
+        return time.replace(tzinfo=JST)
+
+    return time
+
+
+def save_pops(time_defines: List[datetime.datetime], pops: List[str], path: Optional[str] = None) -> None:
+    # The forecast bot only hands over its latest pops; the observer job owns the verification state.
+    path = path or os.getenv("JMA_POPS_PATH", "./jma_pops.json")
+    with open(path, "w") as f:
+        json.dump({"time_defines": [time.isoformat() for time in time_defines], "pops": pops}, f, separators=(",", ":"))
+
+
+class ForecastVerifier():
+    def __init__(self, state_path: Optional[str] = None) -> None:
+        self.state_path: str = state_path or os.getenv("VERIFICATION_STATE_PATH", "./verification_state.json")
+        self.state: Dict[str, Any] = self._load()
+
+    def _new_state(self) -> Dict[str, Any]:
+        return {
+            "scores": {source: self._new_score() for source in source_name_map},
+            "onset_hist": {},
+            "pending_pops": {},
+            "pending_nowcast": {},
+            "predicted_onset": None,
+            "onset_missed": 0,
+            "last_observed_wet": False,
+        }
+
+    def _new_score(self) -> Dict[str, float]:
+        return {"n": 0, "brier": 0.0, "hits": 0, "misses": 0, "false_alarms": 0, "correct_negatives": 0}
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self._new_state()
+
+    def save(self) -> None:
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f, separators=(",", ":"))
+
+    def _update_score(self, source: str, probability: float, observed: bool) -> None:
+        score: Dict[str, float] = self.state["scores"][source]
+        outcome: float = 1.0 if observed else 0.0
+        forecast_yes: bool = probability >= POP_THRESHOLD / 100.0
+
+        score["n"] += 1
+        score["brier"] += (probability - outcome) ** 2
+        if forecast_yes and observed:
+            score["hits"] += 1
+        elif observed:
+            score["misses"] += 1
+        elif forecast_yes:
+            score["false_alarms"] += 1
+        else:
+            score["correct_negatives"] += 1
+
+    def _update_onset_hist(self, error_minutes: float) -> None:
+        clipped: float = max(-ONSET_MAX_MINUTES, min(ONSET_MAX_MINUTES, error_minutes))
+        bin_key: str = str(math.floor(clipped / ONSET_BIN_MINUTES) * ONSET_BIN_MINUTES)
+        self.state["onset_hist"][bin_key] = self.state["onset_hist"].get(bin_key, 0) + 1
+
+    def record_pops(self, time_defines: List[datetime.datetime], pops: List[str]) -> None:
+        # A pop slot lasts until the next time define (6 hours for the last one).
+        pending: Dict[str, List[Any]] = self.state["pending_pops"]
+        time_defines = [_to_jst(time) for time in time_defines]
+        for i, (time, pop) in enumerate(zip(time_defines, pops)):
+            if pop in ("", "-"):
+                continue
+
+            end: datetime.datetime = time_defines[i + 1] if i + 1 < len(time_defines) else time + datetime.timedelta(hours=6)
+            rained, observed = pending.get(time.isoformat(), [None, None, 0, 0])[2:]
+            pending[time.isoformat()] = [end.isoformat(), float(pop) / 100.0, rained, observed]
+
+    def load_pops(self, path: Optional[str] = None) -> None:
+        path = path or os.getenv("JMA_POPS_PATH", "./jma_pops.json")
+        try:
+            with open(path) as f:
+                recorded: Dict[str, List[str]] = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.record_pops([dateparser.parse(time) for time in recorded["time_defines"]], recorded["pops"])
+
+    def record_nowcast(self, weather_list: List[Dict[str, Any]]) -> None:
+        predicted_onset: Optional[str] = None
+        for weather in weather_list:
+            time: datetime.datetime = _to_jst(dateparser.parse(weather["Date"]))
+            rain_fall: float = weather["Rainfall"]
+
+            if weather["Type"] == "observation":
+                self.observe(time, rain_fall)
+                continue
+
+            self.state["pending_nowcast"][time.isoformat()] = rain_fall
+            if predicted_onset is None and rain_fall > 0.0:
+                predicted_onset = time.isoformat()
+
+        # The first prediction of an event is the one verified; later runs only get closer to the onset.
+        if not self.state["last_observed_wet"] and self.state["predicted_onset"] is None:
+            self.state["predicted_onset"] = predicted_onset
+
+    def observe(self, time: datetime.datetime, rain_fall: float) -> None:
+        time = _to_jst(time)
+        observed_wet: bool = rain_fall > 0.0
+
+        pending_nowcast: Dict[str, float] = self.state["pending_nowcast"]
+        for key in [key for key in pending_nowcast if dateparser.parse(key) <= time]:
+            forecast_rain_fall: float = pending_nowcast.pop(key)
+            if dateparser.parse(key) == time:
+                self._update_score("yahoo", 1.0 if forecast_rain_fall > 0.0 else 0.0, observed_wet)
+
+        pending_pops: Dict[str, List[Any]] = self.state["pending_pops"]
+        for key in list(pending_pops):
+            end, probability, rained, observed = pending_pops[key]
+            if time >= dateparser.parse(end):
+                del pending_pops[key]
+                if observed:
+                    self._update_score("jma", probability, bool(rained))
+            elif time >= dateparser.parse(key):
+                pending_pops[key] = [end, probability, int(rained or observed_wet), observed + 1]
+
+        predicted_onset: Optional[str] = self.state["predicted_onset"]
+        if observed_wet and not self.state["last_observed_wet"]:
+            if predicted_onset is not None:
+                delta: datetime.timedelta = time - dateparser.parse(predicted_onset)
+                self._update_onset_hist(delta.total_seconds() / 60)
+            else:
+                self.state["onset_missed"] = self.state.get("onset_missed", 0) + 1
+            self.state["predicted_onset"] = None
+        elif not observed_wet and predicted_onset is not None:
+            # A predicted onset that never came must not be matched against a later, unrelated event.
+            if time - dateparser.parse(predicted_onset) > datetime.timedelta(minutes=ONSET_MAX_MINUTES):
+                self.state["predicted_onset"] = None
+
+        self.state["last_observed_wet"] = observed_wet
+
+    def _format_score(self, source: str) -> str:
+        score: Dict[str, float] = self.state["scores"][source]
+        if score["n"] == 0:
+            return f"*{source_name_map[source]}*\nデータなし"
+
+        brier: float = score["brier"] / score["n"]
+        pod: str = "-"
+        if score["hits"] + score["misses"] > 0:
+            pod = f"{score['hits'] / (score['hits'] + score['misses']) * 100:.0f}%"
+        far: str = "-"
+        if score["hits"] + score["false_alarms"] > 0:
+            far = f"{score['false_alarms'] / (score['hits'] + score['false_alarms']) * 100:.0f}%"
+
+        return (
+            f"*{source_name_map[source]}* ({score['n']}件)\n"
+            f"ブライアスコア: {brier:.3f} 捕捉率: {pod} 空振り率: {far}\n"
+            f"的中: {score['hits']} 見逃し: {score['misses']} 空振り: {score['false_alarms']}"
+        )
+
+    def _format_onset_hist(self) -> str:
+        hist: Dict[str, int] = self.state["onset_hist"]
+        missed: int = self.state.get("onset_missed", 0)
+        if not hist and not missed:
+            return "*降り始め時刻の誤差*\nデータなし"
+
+        peak: int = max(hist.values(), default=0)
+        lines: List[str] = []
+        for bin_key in sorted(hist, key=int):
+            bar: str = "█" * max(1, round(hist[bin_key] / peak * 20))
+            lines.append(f"{int(bin_key):+4d}分 {bar} {hist[bin_key]}")
+
+        lines.append(f"予報なし {missed}")
+
+        lines_text: str = "\n".join(lines)
+        return f"*降り始め時刻の誤差* (実況 - 予報)\n```{lines_text}```"
+
+    def generate_blocks(self) -> Tuple[str, List[dict]]:
+        text: str = "📊予報精度レポート📊"
+        blocks: List[dict] = [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": text,
+                    "emoji": True
+                }
+            },
+        ]
+        for source in source_name_map:
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": self._format_score(source)
+                }
+            })
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": self._format_onset_hist()
+            }
+        })
+
+        return text, blocks
+
+
+def observe() -> None:
+    verifier = ForecastVerifier()
+    verifier.load_pops()
+
+    # Verification statistics track the primary point only.
+    weather_lists: List[List[Dict[str, Any]]] = get_weather_lists(watch_points[:1])
+    if weather_lists:
+        verifier.record_nowcast(weather_lists[0])
+
+    verifier.save()
+
+
+def report() -> None:
+    verifier = ForecastVerifier()
+    text, blocks = verifier.generate_blocks()
+
+    client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+    try:
+        response = client.chat_postMessage(channel="C03F47NNP2T", text=text, blocks=blocks)
+        pprint(response.status_code)
+    except SlackApiError as e:
+        print("Error posting report: {}".format(e))
+
+
+if __name__ == "__main__":
+    if "observe" in sys.argv[1:]:
+        observe()
+    else:
+        report()
@@ -12,8 +12,11 @@ from itertools import zip_longest
 
 import jpholiday # type: ignore
 from slack_sdk import WebClient
-from slack_sdk.web.slack_response import SlackResponse
 from constants import *
+from alert_rules import AlertMatch, AlertRule, AlertRuleEngine, ForecastColumns
+from message_tracker import MessageTracker
+from profiling import profile_run
+from verification import save_pops
 
 
 class DatetimeRelated():
@@ -54,6 +57,7 @@ class ForecastParser():
         self.report_datetime: datetime.datetime
         self.weathers: List[Tuple[str, str, str]]
         self.pops: List[str]
+        self.pop_time_defines: List[datetime.datetime]
         self.temps: List[Tuple[str, str]]
 
     def _zip_contents(self, *contents: list) -> list:
@@ -81,6 +85,7 @@ class ForecastParser():
 
         _pop_area: Dict[str, Any] = _time_series_pop["areas"][area_index]
         self.pops = _pop_area["pops"]
+        self.pop_time_defines = [dateparser.parse(dst) for dst in _time_series_pop["timeDefines"]]
 
         _temp_area: Dict[str, Any] = _time_series_temp["areas"][area_index]
         self.temps = _temp_area["temps"]
@@ -95,7 +100,9 @@ class MessageGenerator():
         pops: Dict[str, tuple],
         temps: Dict[str, tuple],
         dt_now: datetime.datetime = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))),
-        dt_tomorrow: datetime.datetime = datetime.datetime.now() + datetime.timedelta(days=1)
+        dt_tomorrow: datetime.datetime = datetime.datetime.now() + datetime.timedelta(days=1),
+        header_emoji: Optional[str] = None,
+        notices: Optional[List[str]] = None
     ) -> None:
         self.publishing_office = publishing_office
         self.report_datetime = report_datetime
@@ -106,6 +113,9 @@ class MessageGenerator():
         self.dt_now = dt_now
         self.dt_tomorrow = dt_tomorrow
 
+        self.header_emoji: str = header_emoji or random.choice(random_emoji_map)
+        self.notices: List[str] = notices or []
+
     def generate_text(self, type: str) -> str:
         if type == "AM":
             text_header = f"*今日({self.dt_now.month}/{self.dt_now.day})の名古屋の天気* {wc_emoji_map[self.weathers[0][0]]}\n"
@@ -118,7 +128,11 @@ class MessageGenerator():
             text_body_temp = f"*気温* 最低: {self.temps['1-lowest']}℃ 最高: {self.temps['1-highest']}℃\n"
             text_body_pop = f"*降水確率* 午前: {self.pops['1-06-12']}% 午後: {self.pops['1-12-18']}% 夜: {self.pops['1-18-24']}%"
 
-        return f"{text_header}{text_body_weather}{text_body_temp}{text_body_pop}"
+        text_body_notice: str = ""
+        if self.notices:
+            text_body_notice = f"\n*注意* {'、'.join(self.notices)}"
+
+        return f"{text_header}{text_body_weather}{text_body_temp}{text_body_pop}{text_body_notice}"
 
     def generate_blocks(self, type: str) -> List[dict]:
         if type == "AM":
@@ -126,7 +140,7 @@ class MessageGenerator():
                 "type": "header",
                 "text": {
                     "type": "plain_text",
-                    "text": f"おはようございます {random.choice(random_emoji_map)} 天気予報です\n",
+                    "text": f"おはようございます {self.header_emoji} 天気予報です\n",
                     "emoji": True
                 }
             }
@@ -176,7 +190,7 @@ class MessageGenerator():
                 "type": "header",
                 "text": {
                     "type": "plain_text",
-                    "text": f"こんばんは {random.choice(random_emoji_map)} 天気予報です\n",
+                    "text": f"こんばんは {self.header_emoji} 天気予報です\n",
                     "emoji": True
                 }
             }
@@ -264,6 +278,17 @@ class MessageGenerator():
                 blocks_pre_footer, blocks_footer,
             ]
 
+        if self.notices:
+            notice_lines: str = "\n".join(f"• {notice}" for notice in self.notices)
+            blocks_notice: Dict[str, Any] = {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*注意*\n{notice_lines}"
+                }
+            }
+            blocks[-2:-2] = [blocks_notice, blocks_divider]
+
         return blocks
 
 
@@ -274,7 +299,12 @@ class WeatherForecast():
         self.dt_now: datetime.datetime = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
         self.datetime = DatetimeRelated()
         self.forecast_parser = ForecastParser()
+        # Fixed internal rule so editing constants.alert_rules never affects the icon.
+        self.umbrella_rule = AlertRule("umbrella", "weather has rain")
+        self.rule_engine = AlertRuleEngine()
         self.slack_client = WebClient(token=self._get_environ("SLACK_BOT_TOKEN"))
+        self.message_tracker = MessageTracker()
+        self.channel_id: str = "C03F47NNP2T"
 
         self.pop_keys: List[str] = ["0-00-06", "0-06-12", "0-12-18", "0-18-24", "1-00-06", "1-06-12", "1-12-18", "1-18-24"]
         self.temp_keys: List[str] = ["0-lowest", "0-highest", "1-lowest", "1-highest"]
@@ -302,33 +332,54 @@ class WeatherForecast():
         forecast: Dict[str, Any] = self._get_forecast()
         self.forecast_parser.parse(forecast)
 
+        save_pops(self.forecast_parser.pop_time_defines, self.forecast_parser.pops)
+
         publishing_office = self.forecast_parser.publishing_office
         report_datetime = self.forecast_parser.report_datetime
         weathers = self.forecast_parser.weathers
         pops: Dict[str, tuple] = dict(zip_longest(reversed(self.pop_keys), reversed(self.forecast_parser.pops), fillvalue="-"))
         temps: Dict[str, tuple] = dict(zip_longest(reversed(self.temp_keys), reversed(self.forecast_parser.temps), fillvalue="-"))
 
-        message_generator = MessageGenerator(publishing_office, report_datetime, weathers, pops, temps)
-
         am_pm: str = self.datetime.get_am_pm(self.dt_now)
 
+        # Re-runs of the same forecast must render identically, so the header emoji is fixed per message.
+        message_key: str = f"forecast-{self.dt_now.date().isoformat()}-{am_pm}"
+        header_emoji: str = random.Random(message_key).choice(random_emoji_map)
+
+        # Only the area and day the message is about: Nagoya (west), today in the morning and tomorrow in the evening.
+        columns = ForecastColumns(forecast)
+        target_date: datetime.date = self.dt_now.date() + datetime.timedelta(days=0 if am_pm == "AM" else 1)
+        notices: List[str] = [
+            name for name, matches in self.rule_engine.evaluate_columns(columns).items()
+            if any(match.area_index == 0 and match.time.date() == target_date for match in matches)
+        ]
+
+        message_generator = MessageGenerator(
+            publishing_office, report_datetime, weathers, pops, temps, header_emoji=header_emoji, notices=notices)
+
         text: str = message_generator.generate_text(type=am_pm)
         blocks: List[dict] = message_generator.generate_blocks(type=am_pm)
 
+        umbrella_matches: List[AlertMatch] = self.umbrella_rule.evaluate(columns)
+
+        target_slot: int = 0 if am_pm == "AM" else 1
         icon_emoji: Optional[str] = None
-        if (am_pm == "AM" and "雨" in weathers[0][1]) or (am_pm == "PM" and "雨" in weathers[1][1]):
+        if any(match.area_index == 0 and match.slot_index == target_slot for match in umbrella_matches):
             icon_emoji = ":umbrella:"
 
-        response: SlackResponse = self.slack_client.chat_postMessage(
-            channel="C03F47NNP2T",
+        action: Optional[str] = self.message_tracker.send(
+            self.slack_client,
+            channel=self.channel_id,
+            key=message_key,
             text=text,
             blocks=blocks,
             icon_emoji=icon_emoji
         )
 
-        pprint(response.status_code)
+        pprint(action)
 
 
 if __name__ == "__main__":
-    app = WeatherForecast()
-    app.main()
+    with profile_run("weather_forecast"):
+        app = WeatherForecast()
+        app.main()
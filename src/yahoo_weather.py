@@ -0,0 +1,32 @@
+"""yahoo_weather.py"""
+
+import os
+import json
+from typing import Any, Dict, Final, List
+from urllib import request, parse
+
+
+YAHOO_APPID: Final = os.getenv("YAHOO_APPID")
+
+
+def get_weather_lists(points: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    url = 'https://map.yahooapis.jp/weather/V1/place'
+
+    # The place API answers up to 10 coordinates per request.
+    weather_lists: List[List[Dict[str, Any]]] = []
+    for i in range(0, len(points), 10):
+        params = {
+            'appid': YAHOO_APPID,
+            'coordinates': " ".join(f"{point['longitude']},{point['latitude']}" for point in points[i:i + 10]),
+            'output': "json",
+            'interval': 5,
+        }
+
+        req = request.Request(f'{url}?{parse.urlencode(params)}')
+        with request.urlopen(req) as res:
+            body = res.read()
+
+        response = json.loads(body)
+        weather_lists.extend(feature["Property"]["WeatherList"]["Weather"] for feature in response["Feature"])
+
+    return weather_lists
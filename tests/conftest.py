@@ -0,0 +1,22 @@
+import os
+import sys
+import json
+from typing import Any
+
+import pytest
+
+
+# The bots are run as `python3 src/<name>.py`, so their modules import each other by bare name.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+FIXTURE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURE_DIR, name)) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def jma_forecast() -> Any:
+    return load_fixture("jma_forecast.json")[0]
@@ -0,0 +1,33 @@
+import datetime
+
+from alert_digest import AlertDigest
+
+
+NOW: datetime.datetime = datetime.datetime(2022, 5, 10, 13, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+
+
+def test_flush_waits_for_window_and_sorts_by_onset(tmp_path) -> None:
+    digest = AlertDigest(window_minutes=10, state_path=str(tmp_path / "state.json"))
+    digest.add("C", {"name": "名古屋", "onset": "2022-05-10T13:15:00"}, NOW)
+    digest.add("C", {"name": "豊橋", "onset": "2022-05-10T13:05:00"}, NOW)
+    digest.save()
+
+    digest = AlertDigest(window_minutes=10, state_path=str(tmp_path / "state.json"))
+    assert digest.flush(NOW + datetime.timedelta(minutes=5)) == {}
+    flushed = digest.flush(NOW + datetime.timedelta(minutes=10))
+
+    assert [alert["name"] for alert in flushed["C"]] == ["豊橋", "名古屋"]
+    assert not digest.is_pending("C")
+
+
+def test_discard_drops_points_that_stopped_forecasting_rain(tmp_path) -> None:
+    digest = AlertDigest(window_minutes=10, state_path=str(tmp_path / "state.json"))
+    digest.add("C", {"name": "名古屋", "onset": "2022-05-10T13:15:00"}, NOW)
+    digest.add("C", {"name": "豊橋", "onset": "2022-05-10T13:05:00"}, NOW)
+
+    digest.discard("C", "豊橋")
+    assert [alert["name"] for alert in digest.flush(NOW + datetime.timedelta(minutes=10))["C"]] == ["名古屋"]
+
+    digest.add("C", {"name": "名古屋", "onset": "2022-05-10T13:15:00"}, NOW)
+    digest.discard("C", "名古屋")
+    assert not digest.is_pending("C")
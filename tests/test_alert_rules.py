@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+from alert_rules import AlertRule, AlertRuleEngine, ForecastColumns, WeatherAttr, wc_attr_map
+
+
+def test_wc_attr_map_classifies_codes() -> None:
+    assert wc_attr_map["100"] == WeatherAttr.SUNNY
+    assert wc_attr_map["204"] == WeatherAttr.CLOUDY | WeatherAttr.SNOW
+    assert wc_attr_map["231"] & WeatherAttr.RAIN
+    assert wc_attr_map["350"] == WeatherAttr.RAIN | WeatherAttr.THUNDER
+
+
+@pytest.mark.parametrize("expression, value, expected", [
+    ("pop >= 60", 60.0, True),
+    ("pop >= 60", 59.0, False),
+    ("pop ≥ 60", 60.0, True),
+    ("pop ≤ 60", 61.0, False),
+    ("temp_min < 3", 2.5, True),
+    ("temp_max != 20", 20.0, False),
+    ("weather has snow", WeatherAttr.CLOUDY | WeatherAttr.SNOW, True),
+    ("weather not rain", WeatherAttr.RAIN, False),
+])
+def test_compile(expression: str, value, expected: bool) -> None:
+    rule = AlertRule("rule", expression)
+    assert rule.field == expression.split()[0]
+    assert rule._test(value) is expected
+
+
+@pytest.mark.parametrize("expression", [
+    "pop >= ",
+    "pop >= 60 %",
+    "pop => 60",
+    "pop >= sixty",
+    "humidity > 80",
+    "weather has hail",
+    "weather >= rain",
+])
+def test_compile_rejects_bad_input(expression: str) -> None:
+    with pytest.raises(ValueError):
+        AlertRule("rule", expression)
+
+
+def test_forecast_columns(jma_forecast) -> None:
+    columns = ForecastColumns(jma_forecast)
+
+    assert [(row[0], row[1], row[2], row[4]) for row in columns.rows["weather"]] == [
+        (0, "西部", 0, wc_attr_map["313"]),
+        (0, "西部", 1, wc_attr_map["101"]),
+        (0, "西部", 2, wc_attr_map["200"]),
+        (1, "東部", 0, wc_attr_map["204"]),
+        (1, "東部", 1, wc_attr_map["100"]),
+        (1, "東部", 2, wc_attr_map["200"]),
+    ]
+
+    # Empty pops are skipped rather than treated as 0%.
+    assert len(columns.rows["pop"]) == 13
+    assert columns.rows["pop"][7][:3] == (1, "東部", 1)
+
+    # 00:00 temps are the morning lowest and 09:00 temps the daytime highest. Today's 00:00 entry
+    # in a morning report repeats the highest, so it is not a lowest.
+    assert [(row[1], row[4]) for row in columns.rows["temp_min"]] == [("名古屋", 2.0), ("豊橋", 5.0)]
+    assert [(row[1], row[4]) for row in columns.rows["temp_max"]] == [
+        ("名古屋", 18.0), ("名古屋", 21.0), ("豊橋", 19.0), ("豊橋", 22.0)]
+
+
+def test_engine_evaluate(jma_forecast) -> None:
+    matches = AlertRuleEngine({"rain": "weather has rain", "cold": "temp_min < 3"}).evaluate(jma_forecast)
+
+    assert [(match.area_name, match.slot_index) for match in matches["rain"]] == [("西部", 0)]
+    assert [(match.area_name, match.value) for match in matches["cold"]] == [("名古屋", 2.0)]
+    assert matches["cold"][0].time == datetime.datetime(2022, 5, 11, tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
@@ -0,0 +1,75 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from urllib import error
+
+from jma_warning import WarningChange, WarningWatcher
+
+
+def _warning_data(report_datetime: str, warnings: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "reportDatetime": report_datetime,
+        "areaTypes": [
+            {"areas": [
+                {"code": "230010", "warnings": warnings},
+                {"code": "230020", "warnings": [{"status": "発表警報・注意報はなし"}]},
+            ]},
+        ],
+    }
+
+
+@pytest.fixture
+def watcher(tmp_path) -> WarningWatcher:
+    watcher = WarningWatcher(offices=["230000"], state_path=str(tmp_path / "state.json"))
+    watcher.responses = []
+    watcher._fetch = lambda office, last_modified: _respond(watcher.responses.pop(0))
+    return watcher
+
+
+def _respond(response: Any) -> Tuple[str, bytes]:
+    if isinstance(response, Exception):
+        raise response
+    return "", json.dumps(response).encode()
+
+
+def test_first_poll_only_seeds_snapshot(watcher: WarningWatcher) -> None:
+    watcher.responses = [
+        _warning_data("t1", [{"code": "10", "status": "発表"}]),
+        _warning_data("t1", [{"code": "10", "status": "継続"}]),
+        _warning_data("t2", [{"code": "10", "status": "継続"}, {"code": "14", "status": "発表"}]),
+    ]
+
+    assert watcher.poll("230000") == []
+    assert watcher.poll("230000") == []
+    assert watcher.poll("230000") == [WarningChange("230000", "230010", ["14"], [], ["10", "14"])]
+
+
+def test_failed_first_poll_does_not_skip_seeding(watcher: WarningWatcher, tmp_path) -> None:
+    watcher.responses = [
+        error.URLError("timed out"),
+        _warning_data("t1", [{"code": "03", "status": "発表"}, {"code": "10", "status": "発表"}]),
+    ]
+
+    assert watcher.poll_all() == []
+    watcher.save()
+
+    watcher.state = watcher._load()
+    assert watcher.poll_all() == []
+    assert watcher.state["230000"]["areas"]["230010"]["codes"] == ["03", "10"]
+
+
+def test_downgrade_keeps_the_advisory_now_in_force(watcher: WarningWatcher) -> None:
+    watcher.responses = [
+        _warning_data("t1", [{"code": "03", "status": "発表"}]),
+        _warning_data("t2", [{"code": "03", "status": "継続"}]),
+        # JMA drops the old warning code and puts the downgrade status on the advisory.
+        _warning_data("t3", [{"code": "10", "status": "警報から注意報"}]),
+        _warning_data("t4", [{"code": "10", "status": "解除"}]),
+    ]
+
+    watcher.poll("230000")
+    assert watcher.poll("230000") == []
+    assert watcher.poll("230000") == [WarningChange("230000", "230010", ["10"], ["03"], ["10"])]
+    assert watcher.poll("230000") == [WarningChange("230000", "230010", [], ["10"], [])]
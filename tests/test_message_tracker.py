@@ -0,0 +1,45 @@
+from unittest import mock
+
+from message_tracker import MessageTracker
+
+
+def _make_client() -> mock.Mock:
+    client = mock.Mock()
+    client.chat_postMessage.return_value = {"ts": "1.0", "channel": "CID"}
+    client.chat_update.side_effect = lambda **kwargs: {"ts": kwargs["ts"], "channel": kwargs["channel"]}
+    return client
+
+
+def test_send_posts_then_updates_only_on_change(tmp_path) -> None:
+    client = _make_client()
+    tracker = MessageTracker(str(tmp_path / "state.json"))
+
+    assert tracker.send(client, "C", "key", "a", []) == "posted"
+    assert tracker.send(client, "C", "key", "a", []) is None
+    assert tracker.send(client, "C", "key", "b", []) == "updated"
+
+    client.chat_update.assert_called_once_with(channel="CID", ts="1.0", text="b", blocks=[])
+    assert MessageTracker(str(tmp_path / "state.json")).get_ts("C", "key") == "1.0"
+
+
+def test_send_reposts_when_post_options_change(tmp_path) -> None:
+    client = _make_client()
+    tracker = MessageTracker(str(tmp_path / "state.json"))
+
+    tracker.send(client, "C", "key", "a", [], icon_emoji=None)
+    assert tracker.send(client, "C", "key", "a", [], icon_emoji=":umbrella:") == "reposted"
+
+    client.chat_delete.assert_called_once_with(channel="CID", ts="1.0")
+    assert client.chat_postMessage.call_args.kwargs["icon_emoji"] == ":umbrella:"
+    client.chat_update.assert_not_called()
+
+
+def test_close_forgets_message(tmp_path) -> None:
+    client = _make_client()
+    tracker = MessageTracker(str(tmp_path / "state.json"))
+
+    tracker.send(client, "C", "key", "a", [])
+    tracker.close("C", "key")
+
+    assert tracker.get_ts("C", "key") is None
+    assert tracker.send(client, "C", "key", "a", []) == "posted"
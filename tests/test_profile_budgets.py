@@ -0,0 +1,79 @@
+import io
+import json
+import datetime
+from typing import Any, Dict
+from unittest import mock
+
+import pytest
+
+from conftest import FIXTURE_DIR, load_fixture
+from profiling import check_budget, profile_run
+
+
+# Wall time (seconds) and tracemalloc peak (bytes) recorded on the fixture inputs, with headroom.
+fixture_budgets: Dict[str, Dict[str, float]] = load_fixture("profile_budgets.json")
+
+
+def _fake_urlopen(payload: Any) -> mock.Mock:
+    body: bytes = json.dumps(payload, ensure_ascii=False).encode()
+    return mock.Mock(side_effect=lambda req: io.BytesIO(body))
+
+
+def _fake_web_client() -> mock.Mock:
+    client = mock.Mock()
+    client.chat_postMessage.return_value = {"ts": "1.0", "channel": "CID", "ok": True}
+    client.chat_update.side_effect = lambda **kwargs: {"ts": kwargs["ts"], "channel": kwargs["channel"], "ok": True}
+    return mock.Mock(return_value=client)
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setenv("WEATHER_BOT_PROFILE_DIR", str(tmp_path / "profile"))
+    for key in ("MESSAGE_STATE_PATH", "JMA_POPS_PATH", "DIGEST_STATE_PATH"):
+        monkeypatch.setenv(key, str(tmp_path / f"{key.lower()}.json"))
+
+
+def _assert_within_budget(name: str, result: Dict[str, Any]) -> None:
+    assert check_budget(name, result["wall_time"], result["peak_memory"], budgets=fixture_budgets) == []
+
+
+def test_weather_forecast_budget(monkeypatch) -> None:
+    import weather_forecast
+
+    web_client: mock.Mock = _fake_web_client()
+    monkeypatch.setattr(weather_forecast, "WebClient", web_client)
+    monkeypatch.setattr(weather_forecast.request, "urlopen", _fake_urlopen(load_fixture("jma_forecast.json")))
+
+    with profile_run("weather_forecast", enabled=True) as result:
+        app = weather_forecast.WeatherForecast()
+        app.dt_now = datetime.datetime(2022, 5, 10, 7, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+        app.main()
+
+    web_client.return_value.chat_postMessage.assert_called_once()
+    kwargs: Dict[str, Any] = web_client.return_value.chat_postMessage.call_args.kwargs
+    assert kwargs["icon_emoji"] == ":umbrella:"
+    # constants.alert_rules matches for today's Nagoya forecast; tomorrow's 2℃ lowest is not listed.
+    assert kwargs["blocks"][-4]["text"]["text"] == "*注意*\n• 降水確率60%以上"
+    assert kwargs["text"].endswith("\n*注意* 降水確率60%以上")
+    _assert_within_budget("weather_forecast", result)
+
+
+@pytest.mark.parametrize("chart_mode", ["sparkline", "image"])
+def test_rain_alert_budget(monkeypatch, chart_mode: str) -> None:
+    if chart_mode == "image":
+        pytest.importorskip("matplotlib")
+    import rain_alert
+    import yahoo_weather
+
+    web_client: mock.Mock = _fake_web_client()
+    monkeypatch.setattr(rain_alert, "WebClient", web_client)
+    monkeypatch.setattr(rain_alert, "CHART_MODE", chart_mode)
+    monkeypatch.setattr(yahoo_weather.request, "urlopen", _fake_urlopen(load_fixture("yahoo_place.json")))
+
+    with profile_run("rain_alert", enabled=True) as result:
+        rain_alert.main()
+
+    assert web_client.return_value.files_upload.called == (chart_mode == "image")
+    _assert_within_budget(f"rain_alert-{chart_mode}", result)
@@ -0,0 +1,51 @@
+import re
+import datetime
+import unicodedata
+from typing import List
+
+from rain_alert import _generate_body_message, _rebase, _render_summary_table
+
+
+def _display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(char) in ("W", "F") else 1 for char in text)
+
+
+def _column_offsets(row: str) -> List[int]:
+    # Cells never contain two spaces in a row, so runs of 2+ spaces separate columns.
+    return [_display_width(row[:match.start()]) for match in re.finditer(r"(?:^|(?<=  ))\S", row)]
+
+
+def test_summary_table_columns_line_up() -> None:
+    alerts = [
+        {"name": "豊橋", "onset": "2022-05-10T13:05:00", "onset_rain_fall": 4.0,
+         "peak": "2022-05-10T13:10:00", "peak_rain_fall": 8.0, "end": "2022-05-10T13:40:00"},
+        {"name": "名古屋", "onset": "2022-05-10T13:15:00", "onset_rain_fall": 1.0,
+         "peak": "2022-05-10T13:30:00", "peak_rain_fall": 60.0, "end": None},
+    ]
+    text: str = _render_summary_table(alerts)["text"]["text"]
+    rows = text.split("```")[1].split("\n")
+
+    # Every column starts at the same display offset on every row, including the header.
+    assert _column_offsets(rows[0]) == _column_offsets(rows[1]) == _column_offsets(rows[2])
+    assert len(_column_offsets(rows[0])) == 6
+    assert "非常に激しい  -" in rows[2]
+
+
+def test_body_message_for_onset_already_passed() -> None:
+    alert = {"current": "2022-05-10T13:20:00", "onset": "2022-05-10T13:15:00", "onset_rain_fall": 1.0,
+             "peak": "2022-05-10T13:15:00", "peak_rain_fall": 1.0, "end": "2022-05-10T13:18:00"}
+    assert _generate_body_message(alert) == "小雨が降り始めています。"
+
+
+def test_rebase_trims_points_passed_while_held() -> None:
+    alert = {"current": "2022-05-10T13:00:00", "plot_x": [0, 5, 10, 15], "plot_y": [0.0, 1.0, 2.0, 3.0]}
+    _rebase(alert, datetime.datetime(2022, 5, 10, 13, 12))
+
+    assert alert["current"] == "2022-05-10T13:12:00"
+    assert alert["plot_x"] == [0, 5]
+    assert alert["plot_y"] == [2.0, 3.0]
+
+    # Held past the whole nowcast, the last point is kept so the chart can still render.
+    _rebase(alert, datetime.datetime(2022, 5, 10, 14, 0))
+    assert alert["plot_x"] == [0]
+    assert alert["plot_y"] == [3.0]
@@ -0,0 +1,59 @@
+import datetime
+from typing import Any, Dict, List
+
+from verification import JST, ForecastVerifier, save_pops
+
+
+def _weather_list(start: datetime.datetime, observed: float, forecasts: List[float]) -> List[Dict[str, Any]]:
+    weather_list: List[Dict[str, Any]] = [
+        {"Type": "observation", "Date": start.strftime("%Y%m%d%H%M"), "Rainfall": observed}]
+    for i, rain_fall in enumerate(forecasts, 1):
+        weather_list.append({
+            "Type": "forecast",
+            "Date": (start + datetime.timedelta(minutes=5 * i)).strftime("%Y%m%d%H%M"),
+            "Rainfall": rain_fall,
+        })
+    return weather_list
+
+
+def test_pops_handed_over_by_file_are_scored_by_observations(tmp_path) -> None:
+    pops_path: str = str(tmp_path / "jma_pops.json")
+    save_pops(
+        [datetime.datetime(2022, 5, 10, 12, tzinfo=JST), datetime.datetime(2022, 5, 10, 18, tzinfo=JST)],
+        ["70", "20"],
+        path=pops_path,
+    )
+
+    verifier = ForecastVerifier(str(tmp_path / "state.json"))
+    verifier.load_pops(pops_path)
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 13, 0), 0.0, [0, 0, 1.0, 2.0, 0, 0]))
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 13, 20), 1.5, [1.0] * 6))
+    verifier.load_pops(pops_path)
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 19, 0), 0.0, [0] * 6))
+    verifier.save()
+
+    state: Dict[str, Any] = ForecastVerifier(str(tmp_path / "state.json")).state
+    assert state["scores"]["jma"]["hits"] == 1
+    assert abs(state["scores"]["jma"]["brier"] - 0.09) < 1e-9
+    assert state["scores"]["yahoo"]["n"] == 1
+    # Rain was forecast to start at 13:15 and observed at 13:20.
+    assert state["onset_hist"] == {"5": 1}
+
+
+def test_onset_keeps_first_prediction_and_counts_unpredicted_onsets(tmp_path) -> None:
+    verifier = ForecastVerifier(str(tmp_path / "state.json"))
+    # First predicted 13:15; the 13:05 run moving it to 13:10 must not replace it.
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 13, 0), 0.0, [0, 0, 1.0, 1.0, 1.0, 1.0]))
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 13, 5), 0.0, [1.0] * 6))
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 13, 20), 1.5, [0] * 6))
+    # Dry with no rain forecast, then rain nobody predicted.
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 14, 0), 0.0, [0] * 6))
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 14, 10), 2.0, [0] * 6))
+    # A predicted onset that never came expires instead of matching the next event.
+    verifier.record_nowcast(_weather_list(datetime.datetime(2022, 5, 10, 15, 0), 0.0, [0, 1.0, 0, 0, 0, 0]))
+    verifier.observe(datetime.datetime(2022, 5, 10, 16, 15), 0.0)
+
+    assert verifier.state["onset_hist"] == {"5": 1}
+    assert verifier.state["onset_missed"] == 1
+    assert verifier.state["predicted_onset"] is None
+    assert "予報なし 1" in verifier.generate_blocks()[1][-1]["text"]["text"]